@@ -18,10 +18,12 @@ intrinsics
 #pylint: disable=protected-access
 
 from typing import Any, Dict, Tuple, Union, Optional, List
-from functools import wraps
+from collections import OrderedDict
+from functools import lru_cache, singledispatch, wraps
 from itertools import permutations
 
-import copy
+import re
+import weakref
 
 import numpy
 
@@ -38,20 +40,32 @@ from fqe.hamiltonians import restricted_hamiltonian
 from fqe.hamiltonians import sparse_hamiltonian
 from fqe.hamiltonians import sso_hamiltonian
 from fqe.openfermion_utils import largest_operator_index
-from fqe.util import validate_tuple, reverse_bubble_list
+from fqe.util import validate_tuple
 from fqe.fqe_ops import fqe_ops_utils
 
+_HAS_DIGIT = re.compile(r'\d').search
 
-def build_hamiltonian(ops: Union[FermionOperator, hamiltonian.Hamiltonian],
+_HAMILTONIAN_CACHE_SIZE = 32
+_hamiltonian_cache: 'OrderedDict[Tuple[int, int, bool], Tuple[Any, ...]]' = \
+    OrderedDict()
+
+HamiltonianInput = Union[hamiltonian.Hamiltonian, FermionOperator,
+                         Tuple[numpy.ndarray, ...]]
+
+
+@singledispatch
+def build_hamiltonian(ops: HamiltonianInput,
                       norb: int = 0,
                       conserve_number: bool = True,
                       e_0: complex = 0. + 0.j) -> 'hamiltonian.Hamiltonian':
     """Build a Hamiltonian object for FQE.
 
     Args:
-        ops (FermionOperator, hamiltonian.Hamiltonian): input operator as \
-            FermionOperator.  If a Hamiltonian is passed as an argument, \
-            this function returns as is.
+        ops (FermionOperator, hamiltonian.Hamiltonian, Tuple[numpy.ndarray]): \
+            input operator as FermionOperator, or as a tuple of dense \
+            tensors for a RestrictedHamiltonian or a General Hamiltonian. \
+            If a Hamiltonian is passed as an argument, this function \
+            returns as is.
 
         norb (int): the number of orbitals in the system
 
@@ -62,20 +76,45 @@ def build_hamiltonian(ops: Union[FermionOperator, hamiltonian.Hamiltonian],
     Returns:
         (hamiltonian.Hamiltonian): General Hamiltonian that is created from ops
     """
-    if isinstance(ops, hamiltonian.Hamiltonian):
-        return ops
+    raise TypeError('Expected FermionOperator' \
+                    ' but received {}.'.format(type(ops)))
 
-    if isinstance(ops, tuple):
-        validate_tuple(ops)
-        if norb != 0 and ops[0].shape[0] == norb:
-            return restricted_hamiltonian.RestrictedHamiltonian(ops, e_0=e_0)
-        else:
-            return general_hamiltonian.General(ops, e_0=e_0)
 
-    if not isinstance(ops, FermionOperator):
-        raise TypeError('Expected FermionOperator' \
-                        ' but received {}.'.format(type(ops)))
+@build_hamiltonian.register(hamiltonian.Hamiltonian)
+def _build_from_hamiltonian(ops: 'hamiltonian.Hamiltonian',
+                            norb: int = 0,
+                            conserve_number: bool = True,
+                            e_0: complex = 0. + 0.j
+                           ) -> 'hamiltonian.Hamiltonian':
+    """A Hamiltonian is returned as is.
+    """
+    return ops
+
 
+@build_hamiltonian.register(tuple)
+def _build_from_tuple(ops: Tuple[numpy.ndarray, ...],
+                      norb: int = 0,
+                      conserve_number: bool = True,
+                      e_0: complex = 0. + 0.j) -> 'hamiltonian.Hamiltonian':
+    """Build a RestrictedHamiltonian if the tensors match norb, and a General
+    Hamiltonian otherwise.
+    """
+    validate_tuple(ops)
+    if norb != 0 and ops[0].shape[0] == norb:
+        return restricted_hamiltonian.RestrictedHamiltonian(ops, e_0=e_0)
+    else:
+        return general_hamiltonian.General(ops, e_0=e_0)
+
+
+@build_hamiltonian.register(FermionOperator)
+def _build_from_fermion_operator(ops: 'FermionOperator',
+                                 norb: int = 0,
+                                 conserve_number: bool = True,
+                                 e_0: complex = 0. + 0.j
+                                ) -> 'hamiltonian.Hamiltonian':
+    """Analyze the structure of a FermionOperator and build the most specific
+    Hamiltonian for it.
+    """
     assert is_hermitian(ops)
 
     out: Any
@@ -88,20 +127,13 @@ def build_hamiltonian(ops: Union[FermionOperator, hamiltonian.Hamiltonian],
 
         ops = normal_ordered(ops)
 
-        ops_rank, e_0 = split_openfermion_tensor(ops)  # type: ignore
-
-        if norb == 0:
-            for term in ops_rank.values():
-                ablk, bblk = largest_operator_index(term)
-                norb = max(norb, ablk // 2 + 1, bblk // 2 + 1)
-        else:
-            norb = norb
+        ops_rank, e_0, norb = _build_rank_tensors(ops, norb)
 
         ops_mat = {}
         maxrank = 0
-        for rank, term in ops_rank.items():
+        for rank, tensor in ops_rank.items():
             index = rank // 2 - 1
-            ops_mat[index] = fermionops_tomatrix(term, norb)
+            ops_mat[index] = tensor
             maxrank = max(index, maxrank)
 
         if len(ops_mat) == 1 and (0 in ops_mat):
@@ -112,18 +144,16 @@ def build_hamiltonian(ops: Union[FermionOperator, hamiltonian.Hamiltonian],
             out = diagonal_coulomb.DiagonalCoulomb(ops_mat[1], e_0=e_0)
 
         else:
-            dtypes = [xx.dtype for xx in ops_mat.values()]
-            dtypes = numpy.unique(dtypes)
-            assert len(dtypes) == 1
-
-            for i in range(maxrank + 1):
-                if i not in ops_mat:
-                    mat_dim = tuple([2 * norb for _ in range((i + 1) * 2)])
-                    ops_mat[i] = numpy.zeros(mat_dim, dtype=dtypes[0])
-
+            # General needs every rank up to the highest one present; only
+            # the missing lower ranks are filled with zeros
             ops_mat2 = []
             for i in range(maxrank + 1):
-                ops_mat2.append(ops_mat[i])
+                if i in ops_mat:
+                    ops_mat2.append(ops_mat[i])
+                else:
+                    mat_dim = tuple([2 * norb for _ in range((i + 1) * 2)])
+                    ops_mat2.append(numpy.zeros(mat_dim,
+                                                dtype=numpy.complex128))
 
             out = general_hamiltonian.General(tuple(ops_mat2), e_0=e_0)
 
@@ -131,6 +161,50 @@ def build_hamiltonian(ops: Union[FermionOperator, hamiltonian.Hamiltonian],
     return out
 
 
+def _cached_build_hamiltonian(
+        ops: Union[FermionOperator, hamiltonian.Hamiltonian], norb: int,
+        conserve_number: bool) -> 'hamiltonian.Hamiltonian':
+    """Call build_hamiltonian, reusing the result when the same
+    FermionOperator object is passed again without having been modified.
+    The most recently used Hamiltonians are kept, and an entry is dropped as
+    soon as its FermionOperator is garbage collected.
+
+    Args:
+        ops (FermionOperator, hamiltonian.Hamiltonian): input operator
+
+        norb (int): the number of orbitals in the system
+
+        conserve_number (bool): whether the operator conserves the number
+
+    Returns:
+        (hamiltonian.Hamiltonian): Hamiltonian that is created from ops
+    """
+    if not isinstance(ops, FermionOperator):
+        return build_hamiltonian(ops,
+                                 norb=norb,
+                                 conserve_number=conserve_number)
+
+    key = (id(ops), norb, conserve_number)
+    cached = _hamiltonian_cache.get(key)
+    # the weak reference guards against id reuse, the terms against
+    # in-place modification of ops
+    if cached is not None and cached[0]() is ops and cached[1] == ops.terms:
+        _hamiltonian_cache.move_to_end(key)
+        return cached[2]
+
+    hamil = build_hamiltonian(ops, norb=norb, conserve_number=conserve_number)
+    if cached is not None:
+        cached[3].detach()
+    _hamiltonian_cache[key] = (weakref.ref(ops), dict(ops.terms), hamil,
+                               weakref.finalize(ops, _hamiltonian_cache.pop,
+                                                key, None))
+    _hamiltonian_cache.move_to_end(key)
+    if len(_hamiltonian_cache) > _HAMILTONIAN_CACHE_SIZE:
+        _, evicted = _hamiltonian_cache.popitem(last=False)
+        evicted[3].detach()
+    return hamil
+
+
 def transform_to_spin_broken(ops: 'FermionOperator') -> 'FermionOperator':
     """Convert a FermionOperator string from number broken to spin broken
     operators.
@@ -142,20 +216,12 @@ def transform_to_spin_broken(ops: 'FermionOperator') -> 'FermionOperator':
         (FermionOperator): transformed FermionOperator to spin broken indexing
     """
     newstr = FermionOperator()
-    for term in ops.terms:
-        opstr = ''
-        for element in term:
-            if element[0] % 2:
-                if element[1]:
-                    opstr += str(element[0]) + ' '
-                else:
-                    opstr += str(element[0]) + '^ '
-            else:
-                if element[1]:
-                    opstr += str(element[0]) + '^ '
-                else:
-                    opstr += str(element[0]) + ' '
-        newstr += FermionOperator(opstr, ops.terms[term])
+    for term, coeff in ops.terms.items():
+        # creation and annihilation are swapped for the beta (odd) indices.
+        # This maps distinct terms to distinct terms.
+        new_term = tuple(
+            (element[0], element[1] ^ (element[0] % 2)) for element in term)
+        newstr.terms[new_term] = coeff
     return newstr
 
 
@@ -173,26 +239,105 @@ def split_openfermion_tensor(ops: 'FermionOperator'
     """
     e_0 = 0. + 0.j
 
-    split: Dict[int, 'FermionOperator'] = {}
+    split_terms: Dict[int, Dict[Tuple[Tuple[int, int], ...], complex]] = {}
 
-    for term in ops:
-        rank = term.many_body_order()
+    for term, coeff in ops.terms.items():
+        rank = len(term)
 
         if rank % 2:
             raise ValueError('Odd rank term not accepted')
 
         if rank == 0:
-            e_0 += term.terms[()]
+            e_0 += coeff
 
         else:
-            if rank not in split:
-                split[rank] = term
-            else:
-                split[rank] += term
+            split_terms.setdefault(rank, {})[term] = coeff
+
+    split: Dict[int, 'FermionOperator'] = {}
+    for rank, terms in split_terms.items():
+        split[rank] = FermionOperator()
+        split[rank].terms = terms
 
     return split, e_0
 
 
+def _terms_to_soa(
+        ops: 'FermionOperator'
+) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """Convert the terms of a FermionOperator into flat arrays, one entry per
+    term, so that they can be processed without walking the dictionary again.
+
+    Args:
+        ops (FermionOperator): input FermionOperator
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray): the \
+            orbital indices and the creation flags of the operators, padded \
+            with -1 and 0 up to the largest rank, the rank and the \
+            coefficient of each term
+    """
+    nterms = len(ops.terms)
+    ranks = numpy.fromiter((len(term) for term in ops.terms),
+                           dtype=numpy.int64,
+                           count=nterms)
+    max_rank = int(ranks.max(initial=0))
+
+    raw = numpy.array([ele for term in ops.terms for ele in term],
+                      dtype=numpy.int64).reshape((-1, 2))
+    filled = numpy.arange(max_rank) < ranks[:, None]
+
+    indices = numpy.full((nterms, max_rank), -1, dtype=numpy.int64)
+    indices[filled] = raw[:, 0]
+    daggers = numpy.zeros((nterms, max_rank), dtype=numpy.uint8)
+    daggers[filled] = raw[:, 1]
+    coeffs = numpy.fromiter(ops.terms.values(),
+                            dtype=numpy.complex128,
+                            count=nterms)
+    return indices, daggers, ranks, coeffs
+
+
+def _build_rank_tensors(ops: 'FermionOperator', norb: int
+                       ) -> Tuple[Dict[int, numpy.ndarray], complex, int]:
+    """Split normal ordered FermionOperators according to their rank and
+    convert each rank into a dense tensor, walking the terms only once.
+
+    Args:
+        ops (FermionOperator): normal ordered input FermionOperator
+
+        norb (int): the number of orbitals in the system. If 0, it is \
+            determined from the largest index in ops.
+
+    Returns:
+        (Dict[int, numpy.ndarray], complex, int): the tensors keyed by \
+            rank, the scalar part of ops and the number of orbitals
+    """
+    indices, daggers, ranks, coeffs = _terms_to_soa(ops)
+
+    if numpy.any(ranks % 2):
+        raise ValueError('Odd rank term not accepted')
+
+    e_0 = complex(coeffs[ranks == 0].sum())
+
+    valid = indices >= 0
+    ablk = int(indices[valid & (indices % 2 == 0)].max(initial=-1))
+    bblk = int(indices[valid & (indices % 2 == 1)].max(initial=-1))
+
+    if norb == 0:
+        norb = max(ablk // 2 + 1, bblk // 2 + 1)
+    elif norb <= ablk // 2:
+        raise ValueError('Highest alpha index exceeds the norb of orbitals')
+    elif norb <= bblk // 2:
+        raise ValueError('Highest beta index exceeds the norb of orbitals')
+
+    tensors = {}
+    for rank in numpy.unique(ranks[ranks > 0]):
+        select = ranks == rank
+        tensors[int(rank)] = _soa_tomatrix(indices[select, :rank],
+                                           daggers[select, :rank],
+                                           coeffs[select], norb)
+    return tensors, e_0, norb
+
+
 def fermionops_tomatrix(ops: 'FermionOperator', norb: int) -> numpy.ndarray:
     """Convert FermionOperators to a matrix.
 
@@ -216,64 +361,87 @@ def fermionops_tomatrix(ops: 'FermionOperator', norb: int) -> numpy.ndarray:
     if rank % 2:
         raise ValueError('Odd rank operator not supported')
 
-    tensor_dim = [norb * 2 for _ in range(rank)]
-    index_mask = [0 for _ in range(rank)]
+    indices, daggers, ranks, coeffs = _terms_to_soa(ops)
 
-    index_dict_dagger = [[0, 0] for _ in range(rank // 2)]
-    index_dict_nondagger = [[0, 0] for _ in range(rank // 2)]
+    if numpy.any(ranks != rank):
+        raise ValueError('FermionOperator has terms of inconsistent rank')
 
-    tensor = numpy.zeros(tensor_dim, dtype=numpy.complex128)
+    return _soa_tomatrix(indices, daggers, coeffs, norb)
 
-    for term in ops.terms:
 
-        for i in range(rank):
-            index = term[i][0]
+def _soa_tomatrix(indices: numpy.ndarray, daggers: numpy.ndarray,
+                  coeffs: numpy.ndarray, norb: int) -> numpy.ndarray:
+    """Scatter FermionOperator terms of a single rank, given as the arrays \
+    returned by _terms_to_soa, into a dense tensor.
 
-            if i < rank // 2:
-                if not term[i][1]:
-                    raise ValueError('Found annihilation operator where' \
-                                     'creation is expected')
-            elif term[i][1]:
-                raise ValueError('Found creation operator where ' \
-                                 'annihilation is expected')
+    Args:
+        indices (numpy.ndarray): orbital indices of the operators, one row \
+            per term
 
-            spin = index % 2
+        daggers (numpy.ndarray): creation flags of the operators, one row \
+            per term
 
-            if spin == 1:
-                ind = (index - 1) // 2 + norb
-            else:
-                ind = index // 2
+        coeffs (numpy.ndarray): coefficients of the terms
 
-            if i < rank // 2:
-                index_dict_dagger[i][0] = spin
-                index_dict_dagger[i][1] = ind
-            else:
-                index_dict_nondagger[i - rank // 2][0] = spin
-                index_dict_nondagger[i - rank // 2][1] = ind
+        norb (int): the number of orbitals in the system
 
-        parity = reverse_bubble_list(index_dict_dagger)
-        parity += reverse_bubble_list(index_dict_nondagger)
+    Returns:
+        (numpy.ndarray): resulting matrix
+    """
+    nterms, rank = indices.shape
+
+    if not daggers[:, :rank // 2].all():
+        raise ValueError('Found annihilation operator where ' \
+                         'creation is expected')
+    if daggers[:, rank // 2:].any():
+        raise ValueError('Found creation operator where ' \
+                         'annihilation is expected')
+
+    spin = indices % 2
+    index_mask = indices // 2 + spin * norb
+
+    # Within the creation and the annihilation blocks, move the beta
+    # operators in front of the alpha ones (stable), counting the swaps
+    parity = numpy.zeros(nterms, dtype=numpy.int64)
+    for block in (slice(0, rank // 2), slice(rank // 2, rank)):
+        bspin = spin[:, block]
+        alpha_before = numpy.cumsum(1 - bspin, axis=1) - (1 - bspin)
+        parity += numpy.sum(bspin * alpha_before, axis=1)
+        order = numpy.argsort(-bspin, axis=1, kind='stable')
+        index_mask[:, block] = numpy.take_along_axis(index_mask[:, block],
+                                                     order,
+                                                     axis=1)
+
+    tensor = numpy.zeros([norb * 2 for _ in range(rank)],
+                         dtype=numpy.complex128)
+    strides = (norb * 2)**numpy.arange(rank - 1, -1, -1, dtype=numpy.int64)
+    numpy.add.at(tensor.reshape(-1), index_mask @ strides,
+                 (1 - 2 * (parity % 2)) * coeffs)
+
+    axes_list = _symmetrization_axes(rank)
+    tensor2 = numpy.zeros_like(tensor)
+    for axes in axes_list:
+        tensor2 += tensor.transpose(axes)
+    tensor2 /= len(axes_list)
+    return tensor2
 
-        for i in range(rank):
-            if i < rank // 2:
-                index_mask[i] = index_dict_dagger[i][1]
-            else:
-                index_mask[i] = index_dict_nondagger[i - rank // 2][1]
 
-        tensor[tuple(index_mask)] += (-1)**parity * ops.terms[term]
+@lru_cache(maxsize=None)
+def _symmetrization_axes(rank: int) -> Tuple[Tuple[int, ...], ...]:
+    """Generate the axes of the transpositions that permute the creation
+    and the annihilation operators of a rank-rank tensor simultaneously. The
+    result is computed once per rank.
 
-    tensor2 = numpy.zeros_like(tensor)
-    length = 0
-    seed = range(rank // 2)
-    for ip in permutations(seed):
-        iperm = list(ip)
-        jperm = copy.deepcopy(iperm)
-        for j in range(rank // 2):
-            jperm[j] += rank // 2
-        tensor2 += tensor.transpose(iperm + jperm)
-        length += 1
-    tensor2 /= length
-    return tensor2
+    Args:
+        rank (int): the rank of the tensor
+
+    Returns:
+        (Tuple[Tuple[int, ...], ...]): axes to be passed to transpose
+    """
+    half = rank // 2
+    return tuple(perm + tuple(i + half
+                              for i in perm)
+                 for perm in permutations(range(half)))
 
 
 def process_rank2_matrix(mat: numpy.ndarray, norb: int,
@@ -291,22 +459,30 @@ def process_rank2_matrix(mat: numpy.ndarray, norb: int,
     Returns:
         (Hamiltonian): resulting Hamiltonian
     """
-    if not numpy.allclose(mat, mat.conj().T):
-        raise ValueError('Input matrix is not Hermitian')
-
-    test = numpy.copy(mat)
-    numpy.fill_diagonal(test, 0.0)
-    diagonal = not numpy.any(test)
+    # same tolerance as numpy.allclose; written as a negation so that NaN
+    # entries are rejected as well
+    diff = numpy.abs(mat - mat.conj().T)
+    excess = diff - 1.0e-5 * numpy.abs(mat)
+    if not numpy.all(excess <= 1.0e-8):
+        row, col = numpy.unravel_index(excess.argmax(), excess.shape)
+        raise ValueError('Input matrix is not Hermitian: element ({}, {}) ' \
+                         'differs from its conjugate transpose by {}'.format(
+                             row, col, diff[row, col]))
+
+    # mat is Hermitian, so a vanishing lower triangle makes it diagonal
+    diagonal = not numpy.any(numpy.tril(mat, k=-1))
 
     if diagonal:
         return diagonal_hamiltonian.Diagonal(mat.diagonal(), e_0=e_0)
 
-    if mat[norb:2 * norb, :norb].any():
+    if numpy.any(mat[norb:, :norb]):
         return gso_hamiltonian.GSOHamiltonian(tuple([mat]), e_0=e_0)
 
-    if numpy.allclose(mat[:norb, :norb], mat[norb:, norb:]):
-        return restricted_hamiltonian.RestrictedHamiltonian(
-            (mat[:norb, :norb],), e_0=e_0)
+    aa = numpy.ascontiguousarray(mat[:norb, :norb])
+    bb = numpy.ascontiguousarray(mat[norb:, norb:])
+
+    if numpy.all(numpy.abs(aa - bb) <= 1.0e-8 + 1.0e-5 * numpy.abs(bb)):
+        return restricted_hamiltonian.RestrictedHamiltonian((aa,), e_0=e_0)
 
     return sso_hamiltonian.SSOHamiltonian(tuple([mat]), e_0=e_0)
 
@@ -324,9 +500,10 @@ def check_diagonal_coulomb(mat: numpy.ndarray) -> bool:
     dim = mat.shape[0]
     assert mat.shape == (dim, dim, dim, dim)
 
-    test = numpy.copy(mat).reshape((dim * dim, dim * dim))
-    numpy.fill_diagonal(test, 0.0)
-    return not numpy.any(test)
+    # the diagonal of the (dim**2, dim**2) view holds mat[i, j, i, j]; the
+    # tensor is diagonal Coulomb if no other element is nonzero
+    flat = mat.reshape((dim * dim, dim * dim))
+    return numpy.count_nonzero(flat) == numpy.count_nonzero(flat.diagonal())
 
 
 def wrap_rdm(rdm):
@@ -341,7 +518,7 @@ def wrap_rdm(rdm):
         else:
             wfn = self
 
-        if any(char.isdigit() for char in string):
+        if _HAS_DIGIT(string):
             if self.conserve_spin() and not self.conserve_number():
                 string = fqe_ops_utils.switch_broken_symmetry(string)
 
@@ -362,9 +539,8 @@ def wrap_apply(apply):
         Args:
             ops (FermionOperator or Hamiltonian): input operator
         """
-        hamil = build_hamiltonian(ops,
-                                  norb=self.norb(),
-                                  conserve_number=self.conserve_number())
+        hamil = _cached_build_hamiltonian(
+            ops, norb=self.norb(), conserve_number=self.conserve_number())
         return apply(self, hamil)
 
     return convert
@@ -387,9 +563,8 @@ def wrap_time_evolve(time_evolve):
 
             ops (FermionOperator or Hamiltonian): input operator
         """
-        hamil = build_hamiltonian(ops,
-                                  norb=self.norb(),
-                                  conserve_number=self.conserve_number())
+        hamil = _cached_build_hamiltonian(
+            ops, norb=self.norb(), conserve_number=self.conserve_number())
         return time_evolve(self, time, hamil, inplace)
 
     return convert
@@ -428,9 +603,8 @@ def wrap_apply_generated_unitary(apply_generated_unitary):
         Returns:
             newwfn (Wavefunction): a new intialized wavefunction object
         """
-        hamil = build_hamiltonian(ops,
-                                  norb=self.norb(),
-                                  conserve_number=self.conserve_number())
+        hamil = _cached_build_hamiltonian(
+            ops, norb=self.norb(), conserve_number=self.conserve_number())
         return apply_generated_unitary(self,
                                        time,
                                        algo,
@@ -232,13 +232,21 @@ def nbody_matrix(ops: 'FermionOperator', norb: int) -> numpy.ndarray:
     if nop is None:
         return numpy.empty(0)
 
+    nterms = len(ops.terms)
+    index = numpy.array([ele[0] for prod in ops.terms for ele in prod],
+                        dtype=numpy.int64).reshape((nterms, nop))
+    values = numpy.fromiter(ops.terms.values(),
+                            dtype=numpy.complex128,
+                            count=nterms)
+    mat_ele = index // 2 + (index % 2) * orb_ptr
+    # the scatter below goes through the flattened tensor, which would wrap
+    # out-of-range indices into other elements
+    if mat_ele.size and mat_ele.max() >= orbdim:
+        raise IndexError("nbody_matrix: operator index exceeds norb")
+
     mat_dim = [orbdim for _ in range(nop)]
     nbodymat = numpy.zeros(mat_dim, dtype=numpy.complex128)
-    for prod in ops.terms:
-        mat_ele = [((ele[0] - 1) // 2) + orb_ptr if ele[0] % 2 else ele[0] // 2
-                   for ele in prod]
-        ele = tuple(mat_ele)
-        sval = complex(ops.terms[prod])
-        nbodymat[ele] += sval
+    strides = orbdim**numpy.arange(nop - 1, -1, -1, dtype=numpy.int64)
+    numpy.add.at(nbodymat.reshape(-1), mat_ele @ strides, values)
 
     return nbodymat
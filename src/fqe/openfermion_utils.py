@@ -343,13 +343,14 @@ def split_openfermion_tensor(ops: 'FermionOperator'
         split (Dict[int, FermionOperator]): a list of Fermion Operators sorted \
             according to their degree
     """
+    split_terms: Dict[int, Dict[Tuple[Tuple[int, int], ...], complex]] = {}
+    for term, coeff in ops.terms.items():
+        split_terms.setdefault(len(term), {})[term] = coeff
+
     split: Dict[int, 'FermionOperator'] = {}
-    for term in ops:
-        degree = term.many_body_order()
-        if degree not in split:
-            split[degree] = term
-        else:
-            split[degree] += term
+    for degree, terms in split_terms.items():
+        split[degree] = FermionOperator()
+        split[degree].terms = terms
 
     return split
 
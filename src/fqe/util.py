@@ -535,8 +535,8 @@ def tensors_equal(tensor1: Dict[int, numpy.ndarray], \
     subclasses of Hamiltonian). Used in implementing equality operators
     in Hamiltonian subclasses.
 
-    Note: it compares using numpy.all and not numpy.isclose, so that even small
-    numerical deviations may lead to inequality.
+    Note: it compares using numpy.array_equal and not numpy.isclose, so that
+    even small numerical deviations may lead to inequality.
 
     Args:
         tensor1 (Dict[int, numpy.ndarray]): first tensor
@@ -550,6 +550,6 @@ def tensors_equal(tensor1: Dict[int, numpy.ndarray], \
     if tensor1.keys() != tensor2.keys():
         return False
     for (k, v), (k2, v2) in zip(tensor1.items(), tensor2.items()):
-        if k != k2 or not numpy.all(v == v2):
+        if k != k2 or not numpy.array_equal(v, v2):
             return False
     return True
@@ -117,6 +117,27 @@ class Wavefunction:
                     self._symmetry_map = map_broken_symmetry(
                         param[0][1], param[0][2])
 
+    def __deepcopy__(self, memodict: Optional[Dict[int, Any]] = None
+                    ) -> 'Wavefunction':
+        """Construct a new Wavefunction with copies of the coefficients. The
+        sectors are copied with FqeData.__deepcopy__, which shares the FCI
+        graphs instead of traversing them.
+
+        Returns:
+            Wavefunction: an object that is deepcopied from self
+        """
+        out = Wavefunction.__new__(Wavefunction)
+        out._symmetry_map = dict(self._symmetry_map)
+        out._conserved = dict(self._conserved)
+        out._conserve_spin = self._conserve_spin
+        out._conserve_number = self._conserve_number
+        out._norb = self._norb
+        out._civec = {
+            key: copy.deepcopy(sector, memodict)
+            for key, sector in self._civec.items()
+        }
+        return out
+
     def __add__(self, other: 'Wavefunction') -> 'Wavefunction':
         """Intrinsic addition function to combine two wavefunctions.  This acts \
         to iterate through the wavefunctions, combine coefficients of \
@@ -33,7 +33,7 @@ def test_diagonal():
 
     assert test.diagonal()
     assert test.quadratic()
-    assert numpy.allclose(diag, test.diag_values())
+    assert numpy.array_equal(diag, test.diag_values())
 
     time = 2.1
     iht = test.iht(time)
@@ -15,6 +15,7 @@
 """
 
 import copy
+import gc
 from itertools import product
 
 import numpy
@@ -38,6 +39,8 @@ from fqe.fqe_decorators import transform_to_spin_broken
 from fqe.fqe_decorators import fermionops_tomatrix
 from fqe.fqe_decorators import process_rank2_matrix
 from fqe.fqe_decorators import check_diagonal_coulomb
+from fqe.fqe_decorators import _cached_build_hamiltonian
+from fqe.fqe_decorators import _hamiltonian_cache
 from fqe import get_spin_conserving_wavefunction
 
 from fqe.wavefunction import Wavefunction
@@ -106,11 +109,49 @@ def test_process_rank2_matrix():
     with pytest.raises(ValueError):
         process_rank2_matrix(raw, 0)
 
+    with pytest.raises(ValueError):
+        process_rank2_matrix(numpy.full((4, 4), numpy.nan), 2)
+
+    ops = FermionOperator('0^ 2', 1.e3) + FermionOperator('2^ 0', 1.e3 + 1.e-6) \
+        + FermionOperator('0^ 0', 1.0)
+    ham = build_hamiltonian(ops, norb=2)
+    assert isinstance(ham, sso_hamiltonian.SSOHamiltonian)
+
+    herm = numpy.diag(numpy.arange(4.0)).astype(numpy.complex128)
+    herm[2, 1] = 1.0
+    with pytest.raises(ValueError, match=r'\(1, 2\)'):
+        process_rank2_matrix(herm, 2)
+
+    herm = numpy.diag(numpy.arange(4.0)).astype(numpy.complex128)
+    herm[0, 2] = 1.e4
+    herm[2, 0] = 1.e4 + 5.e-2
+    herm[3, 1] = 1.e-2
+    with pytest.raises(ValueError, match=r'\(1, 3\)'):
+        process_rank2_matrix(herm, 2)
+    herm[1, 3] = 1.e-2
+    process_rank2_matrix(herm, 2)
+
+    herm = numpy.full((4, 4), 1.e3, dtype=numpy.complex128)
+    herm[2:, :2] = 0.0
+    herm[:2, 2:] = 0.0
+    herm[2, 2] += 1.e-6
+    ham = process_rank2_matrix(herm, 2)
+    assert isinstance(ham, restricted_hamiltonian.RestrictedHamiltonian)
+
 
 def test_check_diagonal_coulomb():
     mat = numpy.random.rand(4, 4, 4, 4)
     assert not check_diagonal_coulomb(mat)
 
+    mat = numpy.zeros((4, 4, 4, 4), dtype=numpy.complex128)
+    for i in range(4):
+        for j in range(4):
+            mat[i, j, i, j] = 0.1 * (i + 1) * (j + 1)
+    assert check_diagonal_coulomb(mat)
+
+    mat[0, 1, 1, 0] = 1.0e-3
+    assert not check_diagonal_coulomb(mat)
+
 
 def test_transform_to_spin_broken():
     """Check the conversion between number and spin broken
@@ -151,6 +192,44 @@ def test_general_hamiltonian():
     assert ham._tensor[4][6, 0, 5, 2] == -0.5
 
 
+def test_general_hamiltonian_missing_rank():
+    """Only the ranks up to the highest one present are allocated
+    """
+    ops = FermionOperator('1^ 4^ 0 3', 1.0) \
+          + FermionOperator('2^ 4^ 1 3', 0.5)
+    ops += hermitian_conjugated(ops)
+    ham = build_hamiltonian(ops, norb=3)
+    assert isinstance(ham, general_hamiltonian.General)
+    assert ham.rank() == 4
+    assert set(ham._tensor.keys()) == {2, 4}
+    assert ham._tensor[2].shape == (6, 6)
+    assert not numpy.any(ham._tensor[2])
+
+
+def test_cached_build_hamiltonian():
+    """Check that Hamiltonians are reused only for unmodified operators
+    """
+    ops = FermionOperator('0^ 0', 1.0) \
+          + FermionOperator('1^ 1', 2.0) \
+          + FermionOperator('2^ 2', 0.5)
+    ham = _cached_build_hamiltonian(ops, 2, True)
+    assert isinstance(ham, diagonal_hamiltonian.Diagonal)
+    assert _cached_build_hamiltonian(ops, 2, True) is ham
+    assert _cached_build_hamiltonian(ops, 3, True) is not ham
+    assert _cached_build_hamiltonian(ham, 2, True) is ham
+
+    ops += FermionOperator('3^ 3', 1.0)
+    ham2 = _cached_build_hamiltonian(ops, 2, True)
+    assert ham2 is not ham
+    assert ham2.diag_values()[3] == 1.0
+
+    key = (id(ops), 2, True)
+    assert key in _hamiltonian_cache
+    del ops
+    gc.collect()
+    assert key not in _hamiltonian_cache
+
+
 def test_sparse_hamiltonian():
     ops = FermionOperator('5^ 1^ 3^ 2 0 1', 1.0 - 1.j) \
           + FermionOperator('1^ 0^ 2^ 3 1 5', 1.0 + 1.j)
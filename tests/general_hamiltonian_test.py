@@ -27,11 +27,11 @@ def test_general_hamiltonian():
     test = general_hamiltonian.General((h1e,))
     assert test.dim() == 5
     assert test.rank() == 2
-    assert numpy.allclose(h1e, test.tensor(2))
+    assert numpy.array_equal(h1e, test.tensor(2))
     assert test.quadratic()
 
     tensors = test.tensors()
-    assert numpy.allclose(h1e, tensors[0])
+    assert numpy.array_equal(h1e, tensors[0])
 
     time = 3.1
     iht = test.iht(time)
@@ -19,21 +19,22 @@ import numpy
 
 from fqe.hamiltonians import gso_hamiltonian
 
+_RNG = numpy.random.default_rng(409)
+
 
 def test_gso():
     """Test some of the functions in GSOHamiltonian."""
-    numpy.random.seed(seed=409)
     norb = 4
-    h1e = numpy.random.rand(norb, norb).astype(numpy.complex128)
+    h1e = _RNG.random((norb, norb)).astype(numpy.complex128)
     h1e = h1e + h1e.conj().T
     test = gso_hamiltonian.GSOHamiltonian((h1e,))
     assert test.dim() == norb
     assert test.rank() == 2
-    assert numpy.allclose(h1e, test.tensor(2))
+    assert numpy.array_equal(h1e, test.tensor(2))
 
     tensors = test.tensors()
     assert len(tensors) == 1
-    assert numpy.allclose(h1e, tensors[0])
+    assert numpy.array_equal(h1e, tensors[0])
     assert test.quadratic()
 
     trans = test.calc_diag_transform()
@@ -47,7 +48,7 @@ def test_gso():
     iht = test.iht(time)
     assert numpy.allclose(iht, h1e * (-1j * time))
 
-    h2e = numpy.random.rand(norb, norb, norb, norb).astype(numpy.complex128)
+    h2e = _RNG.random((norb, norb, norb, norb)).astype(numpy.complex128)
     test2 = gso_hamiltonian.GSOHamiltonian((h1e, h2e))
     assert not test2.quadratic()
 
@@ -59,14 +60,14 @@ def test_gso():
 
 def test_equality():
     """ Test the equality operator """
-    h1e = numpy.random.rand(5, 5).astype(numpy.complex128)
+    h1e = _RNG.random((5, 5)).astype(numpy.complex128)
     e_0 = -4.2
     test = gso_hamiltonian.GSOHamiltonian((h1e,))
     test2 = gso_hamiltonian.GSOHamiltonian((h1e,))
     assert test == test2
     assert not (test == 1)
 
-    h1e2 = numpy.random.rand(5, 5).astype(numpy.complex128)
+    h1e2 = _RNG.random((5, 5)).astype(numpy.complex128)
 
     test2 = gso_hamiltonian.GSOHamiltonian((h1e2,))
     assert test != test2
@@ -87,5 +87,8 @@ def test_nbody_matrix():
     with pytest.raises(ValueError):
         nbody_matrix(term + of.FermionOperator('0^ 1^ 3 2'), norb=3)
 
+    with pytest.raises(IndexError):
+        nbody_matrix(of.FermionOperator('0^ 5'), norb=2)
+
     empty = nbody_matrix(of.FermionOperator(), norb=3)
     assert numpy.array_equal(empty, numpy.empty(0))
@@ -29,10 +29,10 @@ def test_restricted():
     assert test.dim() == norb
     assert test.rank() == 2
     assert test.quadratic()
-    assert numpy.allclose(h1e, test.tensor(2))
+    assert numpy.array_equal(h1e, test.tensor(2))
 
     tensors = test.tensors()
-    assert numpy.allclose(tensors[0], h1e)
+    assert numpy.array_equal(tensors[0], h1e)
 
     trans = test.calc_diag_transform()
     diag = trans.conj().T @ h1e @ trans
@@ -30,7 +30,7 @@ def test_sso():
     test = sso_hamiltonian.SSOHamiltonian((h1e,))
     assert test.dim() == norb
     assert test.rank() == 2
-    assert numpy.allclose(h1e, test.tensor(2))
+    assert numpy.array_equal(h1e, test.tensor(2))
     assert test.quadratic()
     with pytest.raises(TypeError):
         sso_hamiltonian.SSOHamiltonian("test")
@@ -38,7 +38,7 @@ def test_sso():
         sso_hamiltonian.SSOHamiltonian((numpy.zeros((2, 2, 2)),))
 
     tensors = test.tensors()
-    assert numpy.allclose(tensors[0], h1e)
+    assert numpy.array_equal(tensors[0], h1e)
 
     trans = test.calc_diag_transform()
     diag = trans.conj().T @ h1e @ trans
@@ -69,6 +69,23 @@ def test_init_exceptions():
         Wavefunction(param=[[-1, 0, 4]])
 
 
+def test_deepcopy():
+    """Check that deepcopy copies the coefficients and shares the graphs
+    """
+    test = get_spin_conserving_wavefunction(0, 4)
+    test.set_wfn(strategy='random')
+    out = copy.deepcopy(test)
+    assert out.norb() == test.norb()
+    assert out.conserve_spin() and not out.conserve_number()
+    assert out._symmetry_map == test._symmetry_map
+    assert out._conserved == test._conserved
+    assert out._civec.keys() == test._civec.keys()
+    for key, sector in test._civec.items():
+        assert out._civec[key].coeff is not sector.coeff
+        assert numpy.array_equal(out._civec[key].coeff, sector.coeff)
+        assert out._civec[key]._core is sector._core
+
+
 def test_general_exceptions():
     """Test general method exceptions
     """